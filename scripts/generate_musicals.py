@@ -1,11 +1,28 @@
 import csv
+import gzip
+import io
 import json
 import os
+import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass
 from datetime import date, datetime
+from functools import lru_cache
 from urllib.request import urlopen
 
-OPEN_ENDED_PLACEHOLDERS = {"", "none", "2099-12-31", None}
+OPEN_ENDED_PLACEHOLDERS = frozenset({"", "none", "2099-12-31"})
+
+# Integers ("12", "-3") or decimals with a "." ("1.5", ".5", "-2.", "1.5e3",
+# "1_000.5"); the decimal form follows float()'s grammar, underscores included
+_DIGITS = r"\d(?:_?\d)*"
+_NUMBER_RE = re.compile(
+    rf"(?P<int>-?\d+)|[-+]?(?:{_DIGITS}\.(?:{_DIGITS})?|\.{_DIGITS})(?:[eE][-+]?{_DIGITS})?"
+)
+
+# Output fields process_row() always sets itself, overriding any sheet column
+GENERATED_FIELDS = frozenset({"start_date", "close_date", "status"})
 
 # Keep empty spreadsheet cells as "" in JSON (matches your current style)
 KEEP_EMPTY_AS_EMPTY_STRING = True
@@ -15,6 +32,13 @@ def parse_date(s: str):
     s = (s or "").strip()
     if not s or s.lower() == "none":
         return None
+    # Fast path for the usual zero-padded YYYY-MM-DD; strptime still
+    # handles (or rejects) anything else, e.g. "2024-1-5"
+    if len(s) == 10 and s[4] == "-" and s[7] == "-":
+        try:
+            return date.fromisoformat(s)
+        except ValueError:
+            pass
     return datetime.strptime(s, "%Y-%m-%d").date()
 
 
@@ -25,6 +49,7 @@ def canonical_key(k: str) -> str:
     return k
 
 
+@lru_cache(maxsize=1024)
 def normalize_cell(v: str):
     """
     Schema-agnostic normalization:
@@ -32,6 +57,10 @@ def normalize_cell(v: str):
     - keeps 'none' literal as 'none' (string)
     - converts numeric strings to int/float
     - keeps everything else as string
+
+    Memoized: sheets repeat the same few cell values (scores, flags,
+    blanks) on every row, and the results are immutable. The cache is
+    bounded so unique text (titles, descriptions, URLs) can't pile up.
     """
     if v is None:
         return "" if KEEP_EMPTY_AS_EMPTY_STRING else None
@@ -43,122 +72,236 @@ def normalize_cell(v: str):
     if s.lower() == "none":
         return "none"
 
-    # int inference
-    if s.isdigit() or (s.startswith("-") and s[1:].isdigit()):
+    # numeric inference: one anchored match decides int vs float
+    m = _NUMBER_RE.fullmatch(s)
+    if m:
         try:
-            return int(s)
-        except Exception:
-            pass
-
-    # float inference
-    if "." in s and any(ch.isdigit() for ch in s):
-        try:
-            return float(s)
-        except Exception:
+            return int(s) if m.group("int") else float(s)
+        except ValueError:
             pass
 
     return s
 
 
-def compute_status(start, close, today):
-    if start and today < start:
+def compute_status(start_ord, close_ord, today_ord):
+    """Dates are passed as date.toordinal() ints (None when unset)."""
+    if start_ord is not None and today_ord < start_ord:
         return "future"
-    if close and today > close:
+    if close_ord is not None and today_ord > close_ord:
         return "inactive"
     return "active"
 
 
-def is_visible_on_app(obj) -> bool:
+def is_visible_on_app(v) -> bool:
     """
     Only include rows with visible_on_app == 1.
     Missing/blank defaults to NOT visible (safer).
+    Takes the raw CSV cell, so it is normalized here.
     """
-    v = obj.get("visible_on_app", 0)
     if isinstance(v, str):
-        v = v.strip()
+        v = normalize_cell(v)
     return (v == 1) or (v == "1")
 
 
-def main():
-    sheet_csv_url = os.environ.get("SHEET_CSV_URL")
-    out_path = os.environ.get("OUT_PATH", "musicals.json")
+@dataclass(frozen=True, slots=True)
+class RowLayout:
+    """
+    Per-sheet constants for process_row, worked out once from the
+    (canonicalized) header. Columns the sheet doesn't have point at a
+    blank slot at `width`.
+    """
 
-    if not sheet_csv_url:
-        print("Missing SHEET_CSV_URL env var", file=sys.stderr)
-        sys.exit(1)
+    width: int
+    field_order: list[str]
+    out_cols: list[tuple[str, int]]
+    vis_i: int
+    id_i: int
+    start_i: int
+    close_i: int
+
+    @classmethod
+    def from_header(cls, header: list[str]) -> "RowLayout":
+        width = len(header)
+        col = {k: i for i, k in enumerate(header) if k}
+
+        # Output key order: every object carries the same columns plus the
+        # generated date/status fields, so building each one in sorted order
+        # keeps the JSON stable without re-sorting per row.
+        field_order = sorted(col.keys() | GENERATED_FIELDS)
+
+        return cls(
+            width=width,
+            field_order=field_order,
+            out_cols=[(k, col[k]) for k in field_order if k not in GENERATED_FIELDS],
+            vis_i=col.get("visible_on_app", width),
+            id_i=col.get("id", width),
+            start_i=col.get("start_date", width),
+            close_i=col.get("close_date", width),
+        )
+
+
+def process_row(row: list[str], layout: RowLayout, seen_ids: set, today_ord: int) -> dict | None:
+    """
+    Turn one CSV row into an output object, or None if it is skipped.
+    Columns are looked up by position through `layout`; ids that are kept
+    are added to seen_ids.
+    """
+    # Pad/trim to the header, plus the blank slot for missing columns
+    del row[layout.width:]
+    row.extend([""] * (layout.width + 1 - len(row)))
+
+    # Filter on the few columns that decide inclusion first, so the
+    # full object is only built for rows that are kept. Fully empty
+    # rows fall out at the visibility check.
 
-    today = date.today()
+    # 1) Enforce visibility at generation time
+    if not is_visible_on_app(row[layout.vis_i]):
+        return None
 
-    csv_bytes = urlopen(sheet_csv_url).read()
-    csv_text = csv_bytes.decode("utf-8", errors="replace").splitlines()
-    reader = csv.DictReader(csv_text)
+    # 2) Required field: id
+    show_id = normalize_cell(row[layout.id_i])
+    if isinstance(show_id, str):
+        show_id = show_id.strip()
 
-    musicals = []
-    seen_ids = set()
+    if not show_id:
+        print("Row missing ID; skipping row.", file=sys.stderr)
+        return None
 
-    for row in reader:
-        # Skip fully empty rows
-        if not any((v or "").strip() for v in row.values()):
-            continue
+    if show_id in seen_ids:
+        print(f"Duplicate id '{show_id}' detected; skipping duplicate row.", file=sys.stderr)
+        return None
+    seen_ids.add(show_id)
 
-        # 1) Build object from ALL columns
-        obj = {}
-        for raw_k, raw_v in row.items():
-            key = canonical_key(raw_k)
-            if not key:
-                continue
-            obj[key] = normalize_cell(raw_v)
+    # 3) Dates
+    start_cell = normalize_cell(row[layout.start_i])
+    close_cell = normalize_cell(row[layout.close_i])
 
-        # 2) Enforce visibility at generation time
-        if not is_visible_on_app(obj):
-            continue
+    start = parse_date(str(start_cell or ""))
+    close_raw = str(close_cell or "").strip()
 
-        # 3) Required field: id
-        show_id = obj.get("id")
-        if isinstance(show_id, str):
-            show_id = show_id.strip()
+    close = None
+    if close_raw not in OPEN_ENDED_PLACEHOLDERS:
+        close = parse_date(close_raw)
 
-        if not show_id:
-            print("Row missing ID; skipping row.", file=sys.stderr)
-            continue
+    # 4) Status
+    status = compute_status(
+        start.toordinal() if start else None,
+        close.toordinal() if close else None,
+        today_ord,
+    )
+
+    # 5) Filter out inactive shows even if visible_on_app == 1
+    if status == "inactive":
+        return None
 
-        if show_id in seen_ids:
-            print(f"Duplicate id '{show_id}' detected; skipping duplicate row.", file=sys.stderr)
-            continue
-        seen_ids.add(show_id)
+    # 6) Build object from ALL columns. Keys are laid out in output order
+    # up front; generated fields are filled in below, not normalized here.
+    obj = dict.fromkeys(layout.field_order)
+    for key, i in layout.out_cols:
+        obj[key] = normalize_cell(row[i])
 
-        # 4) Dates
-        start = parse_date(str(obj.get("start_date") or ""))
-        close_raw = str(obj.get("close_date") or "").strip()
+    # Keep dates as strings in output
+    obj["start_date"] = start.isoformat() if start else (start_cell or "")
+    obj["close_date"] = close_raw if close_raw else (close_cell or "")
+    obj["status"] = status
+    return obj
 
-        close = None
-        if close_raw and close_raw not in OPEN_ENDED_PLACEHOLDERS and close_raw.lower() != "none":
-            close = parse_date(close_raw)
 
-        # Keep dates as strings in output
-        obj["start_date"] = start.isoformat() if start else (obj.get("start_date") or "")
-        obj["close_date"] = close_raw if close_raw else (obj.get("close_date") or "")
 
-        # 5) Status
-        status = compute_status(start, close, today)
-        obj["status"] = status
+def fetch(url: str) -> bytes:
+    with urlopen(url) as resp:
+        return resp.read()
+
+
+def open_sheets(urls):
+    """
+    Yield a binary file object per sheet URL, in order.
+    A single sheet is streamed straight from the response; several are
+    downloaded in parallel so later tabs arrive while earlier ones parse.
+    """
+    if len(urls) == 1:
+        with urlopen(urls[0]) as resp:
+            yield resp
+        return
 
-        # 6) NEW: Filter out inactive shows even if visible_on_app == 1
-        if status == "inactive":
-            continue
+    with ThreadPoolExecutor(max_workers=min(4, len(urls))) as pool:
+        for body in pool.map(fetch, urls):
+            yield io.BytesIO(body)
 
-        musicals.append(obj)
 
-    # Write stable JSON to reduce diff noise
+def main():
+    # SHEET_CSV_URL may list several sheets (e.g. one per tab), separated
+    # by whitespace; ids are de-duplicated across all of them.
+    urls = os.environ.get("SHEET_CSV_URL", "").split()
+    out_path = os.environ.get("OUT_PATH", "musicals.json")
+
+    if not urls:
+        print("Missing SHEET_CSV_URL env var", file=sys.stderr)
+        sys.exit(1)
+
+    today_ord = date.today().toordinal()
+
     out_dir = os.path.dirname(out_path)
     if out_dir:
         os.makedirs(out_dir, exist_ok=True)
 
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(musicals, f, ensure_ascii=False, indent=2, sort_keys=True)
-        f.write("\n")
-
-    print(f"Wrote {len(musicals)} musicals to {out_path}")
+    # Rows are written as they are produced, into a temp file that only
+    # replaces out_path once every sheet has been read.
+    tmp_path = out_path + ".tmp"
+    count = 0
+    encode = json.JSONEncoder(ensure_ascii=False, indent=2).encode
+
+    # Don't leave a half-written temp file behind if anything fails
+    try:
+        with ExitStack() as stack:
+            # An OUT_PATH ending in .gz gets gzip output; level 1 is the fast
+            # setting and still shrinks the JSON several times over. The
+            # header carries a fixed mtime and the final file name (not the
+            # temp one), so an unchanged sheet gives byte-identical output.
+            if out_path.endswith(".gz"):
+                raw = stack.enter_context(open(tmp_path, "wb"))
+                gz = gzip.GzipFile(
+                    filename=os.path.basename(out_path[:-3]),
+                    mode="wb",
+                    compresslevel=1,
+                    fileobj=raw,
+                    mtime=0,
+                )
+                f = stack.enter_context(io.TextIOWrapper(gz, encoding="utf-8"))
+            else:
+                f = stack.enter_context(open(tmp_path, "w", encoding="utf-8"))
+
+            # A plain set is the fastest dedup available here: one C-level hash
+            # per id, a few ms even for 50k ids.
+            seen_ids = set()
+
+            for src in open_sheets(urls):
+                reader = csv.reader(io.TextIOWrapper(src, encoding="utf-8", errors="replace", newline=""))
+
+                # Canonicalize the header once and look columns up by position
+                header = [canonical_key(k) for k in next(reader, [])]
+                layout = RowLayout.from_header(header)
+
+                for row in reader:
+                    obj = process_row(row, layout, seen_ids, today_ord)
+                    if obj is None:
+                        continue
+
+                    # Stable JSON to reduce diff noise: the same layout
+                    # json.dump(..., indent=2) gives for the whole list
+                    f.write(",\n  " if count else "[\n  ")
+                    f.write(encode(obj).replace("\n", "\n  "))
+                    count += 1
+
+            f.write("\n]\n" if count else "[]\n")
+
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    print(f"Wrote {count} musicals to {out_path}")
 
 
 if __name__ == "__main__":